@@ -1,11 +1,15 @@
 import os
+import sys
 import json
+import random
 import requests
 from tqdm import tqdm
-import pandas as pd
 import zipfile
 import shutil
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.utils.dataset_reader import DatasetReader
+
 def download_file(url: str, filename: str):
     """下载文件，显示进度条"""
     response = requests.get(url, stream=True)
@@ -47,13 +51,20 @@ def prepare_dataset(output_dir: str = 'data', sample_size: int = 1000):
     
     # 读取并处理数据
     print("处理数据...")
-    df = pd.read_json(os.path.join(output_dir, 'fashion-gen/dataset.json'))
+    reader = DatasetReader(os.path.join(output_dir, 'fashion-gen/dataset.json'))
     
-    # 随机抽样
-    sample_df = df.sample(n=min(sample_size, len(df)), random_state=42)
+    # 蓄水池抽样，流式读取不需要把整个数据集载入内存
+    rng = random.Random(42)
+    sample_data = []
+    for i, item in enumerate(reader):
+        if i < sample_size:
+            sample_data.append(item)
+        else:
+            j = rng.randint(0, i)
+            if j < sample_size:
+                sample_data[j] = item
     
     # 保存处理后的数据
-    sample_data = sample_df.to_dict('records')
     with open(os.path.join(output_dir, 'dataset.json'), 'w') as f:
         json.dump(sample_data, f, indent=2)
     
@@ -22,6 +22,15 @@ class Settings(BaseSettings):
     # 本地模式标志（用于在SageMaker不可用时切换到本地模型）
     USE_LOCAL_MODEL: bool = os.getenv("USE_LOCAL_MODEL", "false").lower() == "true"
     
+    # Profiling Settings（默认关闭，开启后按比例采样请求）
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0.01"))
+    PROFILING_WINDOW_SECONDS: float = float(os.getenv("PROFILING_WINDOW_SECONDS", "0"))
+    PROFILING_OUTPUT_DIR: str = os.getenv("PROFILING_OUTPUT_DIR", "profiles")
+    # cprofile会混入并发请求的调用栈，API建议使用pyinstrument（需单独安装）
+    PROFILING_ENGINE: str = os.getenv("PROFILING_ENGINE", "cprofile")
+    PROFILING_TORCH: bool = os.getenv("PROFILING_TORCH", "false").lower() == "true"
+    
     class Config:
         case_sensitive = True
         env_file = ".env"
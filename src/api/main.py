@@ -1,6 +1,8 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from src.api.config import settings
 from src.api.routers import search
+from src.utils.profiling import ProfilingMiddleware, profiler
 
 app = FastAPI(
     title="Multimodal Search API",
@@ -17,6 +19,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Add profiling middleware only when enabled, so requests pay nothing otherwise
+if settings.PROFILING_ENABLED:
+    profiler.configure(
+        enabled=True,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        output_dir=settings.PROFILING_OUTPUT_DIR,
+        engine=settings.PROFILING_ENGINE,
+        torch_profiler=settings.PROFILING_TORCH,
+    )
+    if settings.PROFILING_WINDOW_SECONDS > 0:
+        profiler.start_window(settings.PROFILING_WINDOW_SECONDS)
+    app.add_middleware(ProfilingMiddleware)
+
 # Include routers
 app.include_router(search.router, prefix="/api/v1/search", tags=["search"])
 
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, UploadFile, File, Form
+from fastapi.responses import Response
 from typing import Optional
 import time
 import torch
@@ -11,6 +12,7 @@ from ...models.image_encoder import ImageEncoder
 from ...models.text_encoder import TextEncoder
 from ...models.fusion import LateFusion
 from ...utils.vector_store import VectorStore
+from ...utils.profiling import profile_section
 
 router = APIRouter()
 
@@ -37,42 +39,55 @@ async def search(
     
     if image:
         contents = await image.read()
-        image_tensor = image_encoder.encode_file(contents)
+        with profile_section("image_encode"):
+            image_tensor = image_encoder.encode_file(contents)
         image_embedding = image_tensor.numpy()
         
     if text:
-        text_tensor = text_encoder.encode(text)
+        with profile_section("text_encode"):
+            text_tensor = text_encoder.encode(text)
         text_embedding = text_tensor.numpy()
     
     # 融合特征
     if image_embedding is not None or text_embedding is not None:
-        combined = fusion.combine(
-            torch.from_numpy(image_embedding) if image_embedding is not None else None,
-            torch.from_numpy(text_embedding) if text_embedding is not None else None
-        ).numpy()
+        with profile_section("fusion"):
+            combined = fusion.combine(
+                torch.from_numpy(image_embedding)
+                if image_embedding is not None else None,
+                torch.from_numpy(text_embedding)
+                if text_embedding is not None else None
+            ).numpy()
         
         # 搜索向量库
         results = vector_store.search(combined, k=top_k)
         
         # 格式化结果
-        search_results = [
-            SearchResult(
-                id=str(idx),
-                score=float(1.0 / (1.0 + dist)),  # 转换距离为相似度分数
-                text=metadata.get("text", ""),
-                image_url=metadata.get("image_url")
-            )
-            for idx, dist, metadata in results
-        ]
+        with profile_section("format_results"):
+            search_results = [
+                SearchResult(
+                    id=str(idx),
+                    score=float(1.0 / (1.0 + dist)),  # 转换距离为相似度分数
+                    text=metadata.get("text", ""),
+                    image_url=metadata.get("image_url")
+                )
+                for idx, dist, metadata in results
+            ]
     else:
         search_results = []
     
     query_time = time.time() - start_time
     
-    return SearchResponse(
-        results=search_results,
-        query_time=query_time
-    )
+    with profile_section("build_response"):
+        response = SearchResponse(
+            results=search_results,
+            query_time=query_time
+        )
+    
+    # 在端点内完成JSON序列化，使其计入profiling（FastAPI对Response不再重复序列化）
+    with profile_section("serialize_response"):
+        body = response.model_dump_json()
+    
+    return Response(content=body, media_type="application/json")
 
 @router.post("/index")
 async def add_to_index(
@@ -85,17 +100,20 @@ async def add_to_index(
     """
     # 获取embeddings
     image_embedding = None
-    text_embedding = text_encoder.encode(text).numpy()
+    with profile_section("text_encode"):
+        text_embedding = text_encoder.encode(text).numpy()
     
     if image:
         contents = await image.read()
-        image_embedding = image_encoder.encode_file(contents).numpy()
+        with profile_section("image_encode"):
+            image_embedding = image_encoder.encode_file(contents).numpy()
     
     # 融合特征
-    combined = fusion.combine(
-        torch.from_numpy(image_embedding) if image_embedding is not None else None,
-        torch.from_numpy(text_embedding)
-    ).numpy()
+    with profile_section("fusion"):
+        combined = fusion.combine(
+            torch.from_numpy(image_embedding) if image_embedding is not None else None,
+            torch.from_numpy(text_embedding)
+        ).numpy()
     
     # 添加到向量存储
     metadata = {
@@ -1,6 +1,9 @@
-import json
+import argparse
+import itertools
+import shutil
 import torch
 import os
+from typing import Dict, Optional
 from PIL import Image
 from tqdm import tqdm
 from transformers import ViTImageProcessor  # 更新为新的处理器
@@ -9,6 +12,11 @@ from ..models.image_encoder import ImageEncoder
 from ..models.text_encoder import TextEncoder
 from ..models.fusion import LateFusion
 from .vector_store import VectorStore
+from .dataset_reader import DatasetReader
+from .profiling import profile_section, profiler
+
+# 每个profiling会话覆盖的记录数
+PROFILE_BATCH_SIZE = 100
 
 class DataLoader:
     def __init__(self, data_dir: str = None):
@@ -28,68 +36,192 @@ class DataLoader:
         self.fusion = LateFusion(alpha=0.5)
         self.vector_store = VectorStore(dimension=768)
 
-    def process_and_index(self, max_items: int = 1000):
+    def process_and_index(
+        self,
+        max_items: Optional[int] = 1000,
+        dataset_file: str = 'dataset.json',
+        shard_index: int = 0,
+        num_shards: int = 1,
+        checkpoint_every: int = 10000,
+        resume: bool = False
+    ):
         """
         Process dataset and index into vector store
         Args:
-            max_items: Maximum number of items to process
+            max_items: Maximum number of items to process in this run (None for all)
+            dataset_file: Dataset file in data_dir (.json, .jsonl or .parquet)
+            shard_index: Index of the shard handled by this process
+            num_shards: Total number of indexer processes splitting the dataset
+            checkpoint_every: Append new items to the store journal and save
+                progress every N items; the full store is written once at the end
+            resume: Continue from the checkpoint of an interrupted run instead
+                of rebuilding the index
         """
-        dataset_path = os.path.join(self.data_dir, 'dataset.json')
+        dataset_path = os.path.join(self.data_dir, dataset_file)
         if not os.path.exists(dataset_path):
             raise FileNotFoundError(f"Dataset file not found at {dataset_path}")
 
-        # Load dataset
-        with open(dataset_path, 'r') as f:
-            dataset = json.load(f)
+        # 每个分片写入独立的目录，便于多进程并行索引
+        save_dir = os.path.join(self.data_dir, 'vector_store')
+        if num_shards > 1:
+            save_dir = os.path.join(
+                save_dir, f'shard-{shard_index:05d}-of-{num_shards:05d}'
+            )
+        checkpoint_path = os.path.join(save_dir, 'checkpoint.json')
+        journal_dir = os.path.join(save_dir, 'journal')
+        if not resume and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+
+        # Stream dataset
+        reader = DatasetReader(
+            dataset_path,
+            shard_index=shard_index,
+            num_shards=num_shards,
+            checkpoint_path=checkpoint_path
+        )
+        if os.path.exists(checkpoint_path):
+            self._restore_vector_store(journal_dir, reader)
+            print(
+                f"Resuming from item {reader.index} "
+                f"with {self.vector_store.next_id} indexed"
+            )
+        elif os.path.exists(journal_dir):
+            # 没有checkpoint时日志中的数据不可信，从头开始
+            shutil.rmtree(journal_dir)
+        self._journaled = self.vector_store.next_id
 
-        # Process items
+        # Process items in batches; profiling samples each batch separately
         processed = 0
-        for item in tqdm(dataset[:max_items], desc="Processing items"):
-            try:
-                # Load image
-                image_path = os.path.join(self.data_dir, 'images', item['image_name'])
-                if not os.path.exists(image_path):
-                    print(f"Image not found: {image_path}")
-                    continue
-                    
-                image = Image.open(image_path)
-                
-                # Get embeddings
-                image_embedding = self.image_encoder.encode(image)
-                text_embedding = self.text_encoder.encode(item['description'])
-                
-                # Combine embeddings
-                combined = self.fusion.combine(image_embedding, text_embedding)
-                
-                # Add to vector store
-                metadata = {
-                    'text': item['description'],
-                    'image_url': image_path,  # 在实际部署时需要改为可访问的URL
-                    'category': item.get('category', ''),
-                    'attributes': item.get('attributes', {})
-                }
-                self.vector_store.add(combined.numpy(), metadata)
-                
-                processed += 1
-                
-            except Exception as e:
-                print(f"Error processing item {item.get('image_name', 'unknown')}: {e}")
-                continue
+        seen = 0
+        batch_size = min(PROFILE_BATCH_SIZE, checkpoint_every)
+        items = iter(tqdm(itertools.islice(reader, max_items), desc="Processing items"))
+        for batch in iter(lambda: list(itertools.islice(items, batch_size)), []):
+            with profiler.session("index"):
+                for item in batch:
+                    if self._index_item(item):
+                        processed += 1
+                seen += len(batch)
+                # 只在批次结束时保存，此时reader的位置恰好是已处理的记录
+                if seen // checkpoint_every > (seen - len(batch)) // checkpoint_every:
+                    self._save_checkpoint(journal_dir, reader)
             
         print(f"Successfully processed {processed} items")
         
-        # 创建保存目录
-        save_dir = os.path.join(self.data_dir, 'vector_store')
-        os.makedirs(save_dir, exist_ok=True)
-        
         # Save vector store
+        self._save_checkpoint(journal_dir, reader)
         self.vector_store.save(save_dir)
         print(f"Vector store saved to {save_dir}")
 
+    def _index_item(self, item: Dict) -> bool:
+        """
+        Encode a single dataset item and add it to the vector store
+        Args:
+            item: Dataset record with image_name and description
+        Returns:
+            bool: True if the item was indexed
+        """
+        try:
+            # Load image
+            image_path = os.path.join(self.data_dir, 'images', item['image_name'])
+            if not os.path.exists(image_path):
+                print(f"Image not found: {image_path}")
+                return False
+                
+            with profile_section("image_load"):
+                image = Image.open(image_path)
+            
+            # Get embeddings
+            with profile_section("image_encode"):
+                image_embedding = self.image_encoder.encode(image)
+            with profile_section("text_encode"):
+                text_embedding = self.text_encoder.encode(item['description'])
+            
+            # Combine embeddings
+            with profile_section("fusion"):
+                combined = self.fusion.combine(image_embedding, text_embedding)
+            
+            # Add to vector store
+            metadata = {
+                'text': item['description'],
+                'image_url': image_path,  # 在实际部署时需要改为可访问的URL
+                'category': item.get('category', ''),
+                'attributes': item.get('attributes', {})
+            }
+            self.vector_store.add(combined.numpy(), metadata)
+            
+            return True
+            
+        except Exception as e:
+            print(f"Error processing item {item.get('image_name', 'unknown')}: {e}")
+            return False
+
+    def _save_checkpoint(self, journal_dir: str, reader: DatasetReader):
+        """
+        Append new items to the journal, then record the reader position
+        together with the journal size
+        Args:
+            journal_dir: Journal directory of the vector store
+            reader: Dataset reader whose position is recorded
+        """
+        state = self.vector_store.append_journal(journal_dir, self._journaled)
+        self._journaled = state['next_id']
+        reader.save_checkpoint(state)
+
+    def _restore_vector_store(self, journal_dir: str, reader: DatasetReader):
+        """
+        Rebuild the store from the journal up to the checkpointed size
+        Args:
+            journal_dir: Journal directory of the vector store
+            reader: Dataset reader holding the checkpoint state
+        """
+        state = reader.checkpoint_state
+        if 'next_id' not in state or 'metadata_bytes' not in state:
+            raise ValueError(
+                f"Checkpoint {reader.checkpoint_path} does not record the vector "
+                f"store size; start without resuming"
+            )
+        # 追加日志后、写checkpoint前中断时，日志中多出的记录会被截掉并重新处理
+        self.vector_store = VectorStore.load_journal(
+            journal_dir,
+            self.vector_store.dimension,
+            state['next_id'],
+            state['metadata_bytes']
+        )
+
 def main():
+    from ..api.config import settings
+
+    # 按环境变量配置profiling（默认关闭）
+    profiler.configure(
+        enabled=settings.PROFILING_ENABLED,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+        output_dir=settings.PROFILING_OUTPUT_DIR,
+        engine=settings.PROFILING_ENGINE,
+        torch_profiler=settings.PROFILING_TORCH,
+    )
+    if settings.PROFILING_WINDOW_SECONDS > 0:
+        profiler.start_window(settings.PROFILING_WINDOW_SECONDS)
+
+    parser = argparse.ArgumentParser(description="Index dataset into vector store")
+    parser.add_argument('--dataset-file', default='dataset.json')
+    parser.add_argument('--max-items', type=int, default=1000, help="0 for all items")
+    parser.add_argument('--shard-index', type=int, default=0)
+    parser.add_argument('--num-shards', type=int, default=1)
+    parser.add_argument('--checkpoint-every', type=int, default=10000)
+    parser.add_argument('--resume', action='store_true',
+                        help="continue an interrupted run from its checkpoint")
+    args = parser.parse_args()
+
     # 实例化并处理数据
     loader = DataLoader()
-    loader.process_and_index(max_items=1000)
+    loader.process_and_index(
+        max_items=args.max_items or None,
+        dataset_file=args.dataset_file,
+        shard_index=args.shard_index,
+        num_shards=args.num_shards,
+        checkpoint_every=args.checkpoint_every,
+        resume=args.resume
+    )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
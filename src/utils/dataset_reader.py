@@ -0,0 +1,248 @@
+import json
+import os
+from typing import Dict, Iterator, Optional
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow是可选依赖，仅读取Parquet时需要
+    pq = None
+
+_WHITESPACE = " \t\r\n"
+# 数字、字面量或转义序列被块边界截断时，剩余部分不会超过这个长度
+_LOOKAHEAD = 16
+
+
+class DatasetReader:
+    def __init__(
+        self,
+        path: str,
+        shard_index: int = 0,
+        num_shards: int = 1,
+        checkpoint_path: Optional[str] = None,
+        chunk_size: int = 1 << 20,
+        batch_size: int = 8192,
+    ):
+        """
+        Lazily iterate over a dataset without loading it into memory.
+        Supports JSON Lines (.jsonl/.ndjson), JSON arrays (.json, parsed in
+        chunks) and Parquet (.parquet, requires pyarrow).
+        Args:
+            path: Path to the dataset file
+            shard_index: Index of this shard (0 <= shard_index < num_shards)
+            num_shards: Total number of shards; item i goes to shard i % num_shards
+            checkpoint_path: File used to persist and resume progress; a checkpoint
+                written for a different or modified dataset is rejected
+            chunk_size: Characters per read for JSON
+            batch_size: Rows per batch converted to Python objects for Parquet
+        """
+        if num_shards < 1 or not 0 <= shard_index < num_shards:
+            raise ValueError(
+                f"Invalid shard {shard_index} of {num_shards} for dataset {path}"
+            )
+
+        self.path = path
+        self.shard_index = shard_index
+        self.num_shards = num_shards
+        self.checkpoint_path = checkpoint_path
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+
+        ext = os.path.splitext(path)[1].lower()
+        if ext in (".jsonl", ".ndjson"):
+            self.format = "jsonl"
+        elif ext == ".json":
+            self.format = "json"
+        elif ext == ".parquet":
+            if pq is None:
+                raise ImportError("pyarrow is required to read Parquet datasets")
+            self.format = "parquet"
+        else:
+            raise ValueError(f"Unsupported dataset format: {path}")
+
+        # 读取进度：index为下一条记录的全局序号，offset为JSONL的字节偏移
+        self.index = 0
+        self.offset = 0
+        self.checkpoint_state: Dict = {}
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            self._load_checkpoint()
+
+    def __iter__(self) -> Iterator[Dict]:
+        if self.format == "jsonl":
+            return self._iter_jsonl()
+        if self.format == "json":
+            return self._iter_json_array()
+        return self._iter_parquet()
+
+    def _in_shard(self, index: int) -> bool:
+        return index % self.num_shards == self.shard_index
+
+    def _iter_jsonl(self) -> Iterator[Dict]:
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            for line in f:
+                self.offset += len(line)
+                if not line.strip():
+                    continue
+                index = self.index
+                self.index += 1
+                # 不属于本分片的行不做JSON解析
+                if self._in_shard(index):
+                    yield json.loads(line)
+
+    def _iter_json_array(self) -> Iterator[Dict]:
+        decoder = json.JSONDecoder()
+        start = self.index
+        index = 0
+
+        with open(self.path, "r", encoding="utf-8") as f:
+            buf = ""
+            pos = 0
+            eof = False
+
+            def fill():
+                # 丢弃已解析部分并读入下一块
+                nonlocal buf, pos, eof
+                chunk = f.read(self.chunk_size)
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+
+            def peek() -> str:
+                # 跳过空白并返回下一个字符，文件结束时返回空串
+                nonlocal pos
+                while True:
+                    while pos < len(buf) and buf[pos] in _WHITESPACE:
+                        pos += 1
+                    if pos < len(buf) or eof:
+                        return buf[pos:pos + 1]
+                    fill()
+
+            def decode():
+                while True:
+                    try:
+                        item, end = decoder.raw_decode(buf, pos)
+                    except json.JSONDecodeError as e:
+                        # 字符串一直延伸到缓冲区末尾（报错位置是开头的引号），
+                        # 或出错位置靠近末尾时，是被块边界截断，读更多再解析；
+                        # 其他位置的错误是语法错误，直接报错
+                        if eof or not (
+                            e.msg.startswith("Unterminated string")
+                            or len(buf) - e.pos < _LOOKAHEAD
+                        ):
+                            raise ValueError(f"Malformed JSON in {self.path}: {e}")
+                        fill()
+                        continue
+                    # 值在缓冲区末尾附近结束时可能被截断（如数字），读更多再解析
+                    if not eof and len(buf) - end < _LOOKAHEAD:
+                        fill()
+                        continue
+                    return item, end
+
+            if peek() != "[":
+                raise ValueError(f"Expected a JSON array in {self.path}")
+            pos += 1
+            closed = peek() == "]"
+
+            while not closed:
+                if peek() == "":
+                    raise ValueError(f"Unexpected end of JSON array in {self.path}")
+                item, pos = decode()
+
+                current = index
+                index += 1
+                # 断点续读时重新解析但丢弃已处理的记录
+                if current >= start:
+                    self.index = index
+                    if self._in_shard(current):
+                        yield item
+
+                separator = peek()
+                if separator == "]":
+                    closed = True
+                elif separator == ",":
+                    pos += 1
+                    if peek() == "]":
+                        raise ValueError(f"Trailing comma in JSON array in {self.path}")
+                else:
+                    raise ValueError(
+                        f"Expected ',' or ']' at item {index} in {self.path}"
+                    )
+
+            pos += 1
+            if peek() != "":
+                raise ValueError(f"Unexpected data after JSON array in {self.path}")
+
+    def _iter_parquet(self) -> Iterator[Dict]:
+        start = self.index
+        index = 0
+        parquet_file = pq.ParquetFile(self.path)
+        for batch in parquet_file.iter_batches(batch_size=self.batch_size):
+            # 整批都已处理过时无需转换为Python对象
+            if index + batch.num_rows <= start:
+                index += batch.num_rows
+                continue
+            for item in batch.to_pylist():
+                current = index
+                index += 1
+                if current < start:
+                    continue
+                self.index = index
+                if self._in_shard(current):
+                    yield item
+
+    def _dataset_fingerprint(self) -> Dict:
+        stat = os.stat(self.path)
+        return {
+            "path": os.path.abspath(self.path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns
+        }
+
+    def _load_checkpoint(self):
+        with open(self.checkpoint_path, "r") as f:
+            data = json.load(f)
+
+        # 数据集被替换或重新生成后，旧的进度不再有效
+        fingerprint = self._dataset_fingerprint()
+        for key, value in fingerprint.items():
+            if data.get(key) != value:
+                raise ValueError(
+                    f"Checkpoint {self.checkpoint_path} does not match dataset "
+                    f"{self.path} ({key} changed); start without resuming"
+                )
+        if (data["shard_index"], data["num_shards"]) != (
+            self.shard_index, self.num_shards
+        ):
+            raise ValueError(
+                f"Checkpoint {self.checkpoint_path} was written for shard "
+                f"{data['shard_index']} of {data['num_shards']}"
+            )
+        self.index = data["index"]
+        self.offset = data["offset"]
+        self.checkpoint_state = data.get("state", {})
+
+    def save_checkpoint(self, state: Optional[Dict] = None):
+        """
+        Persist the current read position so a later run can resume.
+        Call only after every item yielded so far has been fully processed.
+        Args:
+            state: Extra caller state stored with the position
+        """
+        if not self.checkpoint_path:
+            return
+
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # 先写临时文件再替换，避免中断时留下损坏的checkpoint
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                **self._dataset_fingerprint(),
+                "shard_index": self.shard_index,
+                "num_shards": self.num_shards,
+                "index": self.index,
+                "offset": self.offset,
+                "state": state or {}
+            }, f)
+        os.replace(tmp_path, self.checkpoint_path)
@@ -0,0 +1,291 @@
+import contextlib
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Dict
+
+try:
+    import pyinstrument
+except ImportError:  # pyinstrument是可选依赖
+    pyinstrument = None
+
+logger = logging.getLogger(__name__)
+
+# 当前正在采样的会话（未采样时为None，profile_section直接跳过）
+_current_session: contextvars.ContextVar = contextvars.ContextVar(
+    "profiling_session", default=None
+)
+
+
+class ProfileSession:
+    def __init__(self, name: str):
+        """
+        State collected for one sampled request or indexing run.
+        Args:
+            name: Label used in the output directory name
+        """
+        self.name = name
+        self.id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self.sections: Dict[str, Dict[str, float]] = {}
+
+    def record(self, name: str, elapsed: float):
+        """
+        Accumulate wall time spent in a named section.
+        Args:
+            name: Section name
+            elapsed: Seconds spent in the section
+        """
+        stats = self.sections.setdefault(name, {"count": 0, "total": 0.0})
+        stats["count"] += 1
+        stats["total"] += elapsed
+
+
+class Profiler:
+    def __init__(
+        self,
+        enabled: bool = False,
+        sample_rate: float = 0.01,
+        output_dir: str = "profiles",
+        engine: str = "cprofile",
+        torch_profiler: bool = False,
+    ):
+        """
+        Opt-in sampling profiler for search and indexing hot paths.
+        Args:
+            enabled: Master switch; when False every hook is a no-op
+            sample_rate: Fraction of requests to profile (0.0 - 1.0)
+            output_dir: Directory where profiles are written
+            engine: Call tree engine, "cprofile" or "pyinstrument"
+                (cProfile is thread-wide; prefer pyinstrument for the API)
+            torch_profiler: Also capture a PyTorch profiler trace
+        """
+        self.configure(enabled, sample_rate, output_dir, engine, torch_profiler)
+        self.window_until = 0.0
+        # Python同一时间只允许一个调用跟踪器，采样会话互斥
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        enabled: bool = False,
+        sample_rate: float = 0.01,
+        output_dir: str = "profiles",
+        engine: str = "cprofile",
+        torch_profiler: bool = False,
+    ):
+        """
+        Update profiler settings at runtime.
+        Args:
+            See __init__
+        """
+        if engine not in ("cprofile", "pyinstrument"):
+            raise ValueError(f"Unknown profiling engine: {engine}")
+        if engine == "pyinstrument" and pyinstrument is None:
+            raise ImportError("pyinstrument is not installed")
+
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.output_dir = output_dir
+        self.engine = engine
+        self.torch_profiler = torch_profiler
+
+    def start_window(self, seconds: float):
+        """
+        Profile every request for a bounded time window.
+        Args:
+            seconds: Length of the window
+        """
+        self.window_until = time.time() + seconds
+
+    def should_sample(self) -> bool:
+        """
+        Decide whether the next request or run should be profiled.
+        Returns:
+            bool: True if a session should be started
+        """
+        if not self.enabled:
+            return False
+        if time.time() < self.window_until:
+            return True
+        return random.random() < self.sample_rate
+
+    @contextlib.contextmanager
+    def session(self, name: str):
+        """
+        Profile the enclosed block and write the results to disk.
+        Yields the ProfileSession, or None when the block is not sampled.
+        Args:
+            name: Label for the profile (e.g. request path or "index")
+        """
+        if not self.should_sample():
+            yield None
+            return
+        # 已有会话在运行时不再嵌套采样
+        if not self._lock.acquire(blocking=False):
+            yield None
+            return
+
+        session = ProfileSession(name)
+        token = _current_session.set(session)
+        call_profiler = None
+        torch_prof = None
+        try:
+            call_profiler = self._start_call_profiler()
+            torch_prof = self._start_torch_profiler()
+        except Exception:
+            # profiler启动失败不能影响请求或索引，按未采样处理
+            logger.exception("Failed to start profiler for %s", name)
+            self._finish(session, token, call_profiler, torch_prof, write=False)
+            session = None
+        if session is None:
+            yield None
+            return
+
+        try:
+            yield session
+        finally:
+            self._finish(session, token, call_profiler, torch_prof, write=True)
+
+    def _finish(self, session, token, call_profiler, torch_prof, write: bool):
+        # 停止profiler并写出结果；任何失败只记录日志，不向被采样的代码抛出
+        try:
+            try:
+                if torch_prof is not None:
+                    torch_prof.__exit__(None, None, None)
+            finally:
+                if call_profiler is not None:
+                    self._stop_call_profiler(call_profiler)
+            if write:
+                self._write(session, call_profiler, torch_prof)
+        except Exception:
+            logger.exception(
+                "Failed to write profile %s (%s)", session.id, session.name
+            )
+        finally:
+            _current_session.reset(token)
+            self._lock.release()
+
+    def _start_call_profiler(self):
+        if self.engine == "pyinstrument":
+            call_profiler = pyinstrument.Profiler(async_mode="enabled")
+            call_profiler.start()
+        else:
+            call_profiler = cProfile.Profile()
+            call_profiler.enable()
+        return call_profiler
+
+    def _stop_call_profiler(self, call_profiler):
+        if self.engine == "pyinstrument":
+            call_profiler.stop()
+        else:
+            call_profiler.disable()
+
+    def _start_torch_profiler(self):
+        if not self.torch_profiler:
+            return None
+        import torch
+
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        torch_prof = torch.profiler.profile(activities=activities)
+        torch_prof.__enter__()
+        return torch_prof
+
+    def _write(self, session: ProfileSession, call_profiler, torch_prof):
+        safe_name = session.name.replace(" ", "").replace("/", "_").strip("_")
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(session.started_at))
+        directory = os.path.join(
+            self.output_dir, f"{stamp}-{safe_name or 'root'}-{session.id}"
+        )
+        os.makedirs(directory, exist_ok=True)
+
+        # 调用树：cProfile可用snakeviz/pstats查看，pyinstrument输出HTML
+        if self.engine == "pyinstrument":
+            with open(os.path.join(directory, "calltree.html"), "w") as f:
+                f.write(call_profiler.output_html())
+        else:
+            call_profiler.dump_stats(os.path.join(directory, "cprofile.prof"))
+
+        if torch_prof is not None:
+            torch_prof.export_chrome_trace(
+                os.path.join(directory, "torch_trace.json")
+            )
+
+        with open(os.path.join(directory, "sections.json"), "w") as f:
+            json.dump({
+                "name": session.name,
+                "id": session.id,
+                "started_at": session.started_at,
+                "duration": time.time() - session.started_at,
+                "sections": session.sections
+            }, f, indent=2)
+
+
+@contextlib.contextmanager
+def profile_section(name: str):
+    """
+    Time a named hot path inside the active profiling session.
+    Does nothing unless the current request or run is being sampled.
+    Args:
+        name: Section name (e.g. "text_encode", "faiss_search")
+    """
+    session = _current_session.get()
+    if session is None:
+        yield
+        return
+
+    record_function = None
+    if profiler.torch_profiler:
+        import torch
+
+        record_function = torch.profiler.record_function(name)
+        record_function.__enter__()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        session.record(name, time.perf_counter() - start)
+        if record_function is not None:
+            record_function.__exit__(None, None, None)
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling a sampled fraction of HTTP requests.
+    cProfile traces the whole event-loop thread, so with concurrent requests
+    its call tree also contains other requests; use the "pyinstrument" engine
+    (async_mode) for the API, or cProfile only with a single worker.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        with profiler.session(f"{scope['method']} {scope['path']}") as session:
+            if session is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_profile_id(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"x-profile-id", session.id.encode()))
+                    message = {**message, "headers": headers}
+                await send(message)
+
+            await self.app(scope, receive, send_with_profile_id)
+
+
+# 全局共享实例，默认关闭
+profiler = Profiler()
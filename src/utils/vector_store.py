@@ -4,6 +4,8 @@ from typing import List, Tuple, Dict
 import json
 import os
 
+from .profiling import profile_section
+
 class VectorStore:
     def __init__(self, dimension: int = 768):
         """
@@ -32,7 +34,8 @@ class VectorStore:
         vector = vector.reshape(1, -1).astype(np.float32)
         
         # 添加到FAISS索引
-        self.index.add(vector)
+        with profile_section("faiss_add"):
+            self.index.add(vector)
         
         # 存储元数据
         self.metadata[self.next_id] = metadata
@@ -53,7 +56,8 @@ class VectorStore:
         query_vector = query_vector.reshape(1, -1).astype(np.float32)
         
         # 搜索最近邻
-        distances, indices = self.index.search(query_vector, k)
+        with profile_section("faiss_search"):
+            distances, indices = self.index.search(query_vector, k)
         
         # 组合结果
         results = []
@@ -71,17 +75,37 @@ class VectorStore:
         """
         os.makedirs(directory, exist_ok=True)
         
-        # 保存FAISS索引
-        faiss.write_index(self.index, os.path.join(directory, "index.faiss"))
+        # 先写临时文件再替换，避免中断时留下损坏的文件
+        # 索引先于元数据写入，因此中断后索引中的向量只会多于元数据
+        index_path = os.path.join(directory, "index.faiss")
+        with profile_section("faiss_write"):
+            faiss.write_index(self.index, index_path + ".tmp")
+            os.replace(index_path + ".tmp", index_path)
         
         # 保存元数据
-        with open(os.path.join(directory, "metadata.json"), "w") as f:
-            json.dump({
-                "metadata": self.metadata,
-                "next_id": self.next_id,
-                "dimension": self.dimension
-            }, f)
+        metadata_path = os.path.join(directory, "metadata.json")
+        with profile_section("metadata_write"):
+            with open(metadata_path + ".tmp", "w") as f:
+                json.dump({
+                    "metadata": self.metadata,
+                    "next_id": self.next_id,
+                    "dimension": self.dimension
+                }, f)
+            os.replace(metadata_path + ".tmp", metadata_path)
             
+    def truncate(self, size: int):
+        """
+        Drop every vector with an id >= size.
+        Args:
+            size: Number of vectors to keep
+        """
+        if size > self.index.ntotal:
+            raise ValueError(f"Cannot truncate {self.index.ntotal} vectors to {size}")
+        
+        self.index.remove_ids(np.arange(size, self.index.ntotal, dtype=np.int64))
+        self.metadata = {k: v for k, v in self.metadata.items() if k < size}
+        self.next_id = size
+        
     @classmethod
     def load(cls, directory: str) -> "VectorStore":
         """
@@ -103,4 +127,89 @@ class VectorStore:
         # 加载FAISS索引
         store.index = faiss.read_index(os.path.join(directory, "index.faiss"))
         
-        return store
\ No newline at end of file
+        # 保存中断时索引可能多出未写入元数据的向量
+        if store.index.ntotal > store.next_id:
+            store.truncate(store.next_id)
+        
+        return store        
+    def append_journal(self, directory: str, start: int) -> Dict[str, int]:
+        """
+        Append vectors and metadata with ids in [start, next_id) to an
+        append-only journal, so each checkpoint only writes the new items.
+        Args:
+            directory: Journal directory
+            start: First id not yet written to the journal
+        Returns:
+            Dict with next_id and metadata_bytes to record in a checkpoint
+        """
+        os.makedirs(directory, exist_ok=True)
+        vectors_path = os.path.join(directory, "vectors.f32")
+        metadata_path = os.path.join(directory, "metadata.jsonl")
+        count = self.next_id - start
+        
+        with profile_section("journal_write"):
+            with open(vectors_path, "ab") as f:
+                if count > 0:
+                    vectors = self.index.reconstruct_n(start, count)
+                    f.write(vectors.astype(np.float32).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            
+            with open(metadata_path, "ab") as f:
+                for idx in range(start, self.next_id):
+                    f.write((json.dumps(self.metadata[idx]) + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+        
+        return {
+            "next_id": self.next_id,
+            "metadata_bytes": os.path.getsize(metadata_path)
+        }
+        
+    @classmethod
+    def load_journal(
+        cls, directory: str, dimension: int, next_id: int, metadata_bytes: int
+    ) -> "VectorStore":
+        """
+        Rebuild a store from its journal, dropping data appended after the
+        checkpoint that recorded next_id and metadata_bytes.
+        Args:
+            directory: Journal directory
+            dimension: Dimension of the stored vectors
+            next_id: Number of items recorded by the checkpoint
+            metadata_bytes: Size of metadata.jsonl recorded by the checkpoint
+        Returns:
+            VectorStore instance
+        """
+        vectors_path = os.path.join(directory, "vectors.f32")
+        metadata_path = os.path.join(directory, "metadata.jsonl")
+        vectors_bytes = next_id * dimension * np.dtype(np.float32).itemsize
+        if (
+            os.path.getsize(vectors_path) < vectors_bytes
+            or os.path.getsize(metadata_path) < metadata_bytes
+        ):
+            raise ValueError(f"Journal in {directory} is shorter than its checkpoint")
+        
+        # 截掉checkpoint之后追加的数据，后续追加从这里继续
+        os.truncate(vectors_path, vectors_bytes)
+        os.truncate(metadata_path, metadata_bytes)
+        
+        store = cls(dimension=dimension)
+        if next_id > 0:
+            vectors = np.memmap(
+                vectors_path, dtype=np.float32, mode="r", shape=(next_id, dimension)
+            )
+            # 分批加入索引，避免一次性复制整个文件
+            for i in range(0, next_id, 100000):
+                store.index.add(np.ascontiguousarray(vectors[i:i + 100000]))
+        
+        with open(metadata_path, "rb") as f:
+            store.metadata = {idx: json.loads(line) for idx, line in enumerate(f)}
+        if len(store.metadata) != next_id:
+            raise ValueError(
+                f"Journal in {directory} has {len(store.metadata)} metadata "
+                f"records, checkpoint expects {next_id}"
+            )
+        store.next_id = next_id
+        
+        return store
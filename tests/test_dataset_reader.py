@@ -0,0 +1,228 @@
+import builtins
+import json
+import os
+
+import pytest
+
+from src.utils.dataset_reader import DatasetReader
+
+ITEMS = [
+    {"image_name": f"item{i}.jpg", "description": "é" * (i % 3), "price": i * 1.25}
+    for i in range(20)
+] + [1234567890, -1.5e-7, "tail", None, True]
+
+
+def _write_json(path, items, indent=2, ensure_ascii=False):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(items, f, indent=indent, ensure_ascii=ensure_ascii)
+    return str(path)
+
+
+def _write_jsonl(path, items):
+    with open(path, "w", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        f.write("\n")
+    return str(path)
+
+
+def _write_parquet(path, items):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    pq.write_table(pa.Table.from_pylist(items), str(path), row_group_size=4)
+    return str(path)
+
+
+@pytest.fixture(params=["json", "jsonl", "parquet"])
+def dataset(request, tmp_path):
+    """Write the test records in each supported format."""
+    if request.param == "json":
+        return _write_json(tmp_path / "dataset.json", ITEMS), ITEMS
+    if request.param == "jsonl":
+        return _write_jsonl(tmp_path / "dataset.jsonl", ITEMS), ITEMS
+    # Parquet needs a uniform schema
+    records = ITEMS[:20]
+    return _write_parquet(tmp_path / "dataset.parquet", records), records
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1 << 20])
+def test_reads_all_items_across_chunk_boundaries(dataset, chunk_size):
+    path, items = dataset
+    reader = DatasetReader(path, chunk_size=chunk_size, batch_size=chunk_size)
+    assert list(reader) == items
+
+
+@pytest.mark.parametrize("text", ["[12345.678e-3]", "[-0.5, 1e10, 100]", "[true,null]"])
+def test_json_numbers_and_literals_split_across_chunks(tmp_path, text):
+    path = tmp_path / "dataset.json"
+    path.write_text(text)
+
+    expected = json.loads(text)
+    for chunk_size in range(1, len(text) + 1):
+        assert list(DatasetReader(str(path), chunk_size=chunk_size)) == expected
+
+
+@pytest.mark.parametrize("ensure_ascii", [False, True])
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1000, 4096])
+def test_json_strings_longer_than_chunk(tmp_path, chunk_size, ensure_ascii):
+    items = [
+        {"description": "long \\ \"quoted\" é\u00e9 " * (i * 40), "id": i}
+        for i in range(10)
+    ]
+    path = _write_json(tmp_path / "dataset.json", items, ensure_ascii=ensure_ascii)
+
+    assert list(DatasetReader(path, chunk_size=chunk_size)) == items
+
+
+def test_real_size_json_with_default_chunk(tmp_path):
+    items = [
+        {"image_name": f"item{i}.jpg", "description": f"{i} " + "x" * 500}
+        for i in range(5000)
+    ]
+    path = _write_json(tmp_path / "dataset.json", items)
+    assert os.path.getsize(path) > 2 * (1 << 20)
+
+    assert list(DatasetReader(path)) == items
+
+
+def test_empty_json_array(tmp_path):
+    path = tmp_path / "dataset.json"
+    path.write_text(" [ ] \n")
+    assert list(DatasetReader(str(path), chunk_size=1)) == []
+
+
+@pytest.mark.parametrize("num_shards", [1, 2, 3])
+def test_shards_partition_the_dataset(dataset, num_shards):
+    path, items = dataset
+    shards = [
+        list(DatasetReader(
+            path, shard_index=i, num_shards=num_shards, chunk_size=5, batch_size=5
+        ))
+        for i in range(num_shards)
+    ]
+
+    for i, shard in enumerate(shards):
+        assert shard == items[i::num_shards]
+
+
+def test_invalid_shard(tmp_path):
+    path = _write_jsonl(tmp_path / "dataset.jsonl", ITEMS)
+    with pytest.raises(ValueError):
+        DatasetReader(path, shard_index=2, num_shards=2)
+
+
+def test_resume_from_checkpoint(dataset, tmp_path):
+    path, items = dataset
+    checkpoint = str(tmp_path / "checkpoint.json")
+
+    reader = DatasetReader(
+        path, shard_index=1, num_shards=2, checkpoint_path=checkpoint,
+        chunk_size=3, batch_size=3
+    )
+    iterator = iter(reader)
+    first = [next(iterator) for _ in range(4)]
+    reader.save_checkpoint({"next_id": 4})
+
+    resumed = DatasetReader(
+        path, shard_index=1, num_shards=2, checkpoint_path=checkpoint,
+        chunk_size=3, batch_size=3
+    )
+    assert resumed.checkpoint_state == {"next_id": 4}
+    assert first + list(resumed) == items[1::2]
+
+
+def test_checkpoint_for_other_shard_is_rejected(tmp_path):
+    path = _write_jsonl(tmp_path / "dataset.jsonl", ITEMS)
+    checkpoint = str(tmp_path / "checkpoint.json")
+    DatasetReader(path, 0, 2, checkpoint_path=checkpoint).save_checkpoint()
+
+    with pytest.raises(ValueError, match="shard"):
+        DatasetReader(path, 1, 2, checkpoint_path=checkpoint)
+
+
+def test_checkpoint_for_other_dataset_is_rejected(tmp_path):
+    path = _write_jsonl(tmp_path / "dataset.jsonl", ITEMS[:3])
+    checkpoint = str(tmp_path / "checkpoint.json")
+    reader = DatasetReader(path, checkpoint_path=checkpoint)
+    list(reader)
+    reader.save_checkpoint()
+
+    other = _write_jsonl(tmp_path / "other.jsonl", ITEMS[:1])
+    with pytest.raises(ValueError, match="does not match"):
+        DatasetReader(other, checkpoint_path=checkpoint)
+
+
+def test_checkpoint_for_regenerated_dataset_is_rejected(tmp_path):
+    path = _write_jsonl(tmp_path / "dataset.jsonl", ITEMS[:3])
+    checkpoint = str(tmp_path / "checkpoint.json")
+    reader = DatasetReader(path, checkpoint_path=checkpoint)
+    list(reader)
+    reader.save_checkpoint()
+
+    # 同样大小但内容不同的新文件
+    _write_jsonl(path, ITEMS[3:6])
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    with pytest.raises(ValueError, match="does not match"):
+        DatasetReader(path, checkpoint_path=checkpoint)
+
+
+@pytest.mark.parametrize("text", [
+    "[1 2 3]",
+    "[1,,2]",
+    "[1,2,]",
+    "[1,2] trailing garbage",
+    "[1,2][3]",
+    '[{"a": 1}, {"a": }]',
+    "[1, 2",
+    '["unterminated',
+    '["raw\ncontrol"]',
+    "[",
+    "",
+    '{"a": 1}',
+])
+def test_malformed_json_is_rejected(tmp_path, text):
+    path = tmp_path / "dataset.json"
+    path.write_text(text)
+
+    for chunk_size in (1, 4, 1 << 20):
+        with pytest.raises(ValueError):
+            list(DatasetReader(str(path), chunk_size=chunk_size))
+
+
+def test_syntax_error_does_not_read_rest_of_file(tmp_path, monkeypatch):
+    path = tmp_path / "dataset.json"
+    path.write_text("[1, @" + " " * 1000 + ", 2]")
+    size = os.path.getsize(path)
+
+    reads = []
+    original_open = builtins.open
+
+    class CountingFile:
+        def __init__(self, f):
+            self.f = f
+
+        def read(self, n):
+            reads.append(n)
+            return self.f.read(n)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            self.f.close()
+
+    monkeypatch.setattr(
+        builtins, "open", lambda *args, **kwargs: CountingFile(
+            original_open(*args, **kwargs)
+        )
+    )
+    with pytest.raises(ValueError, match="Malformed"):
+        list(DatasetReader(str(path), chunk_size=64))
+
+    assert sum(reads) < size
+
+
+def test_unsupported_format(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported"):
+        DatasetReader(str(tmp_path / "dataset.csv"))
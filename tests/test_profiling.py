@@ -0,0 +1,179 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+from src.utils import profiling
+from src.utils.profiling import Profiler, ProfilingMiddleware, profile_section
+
+
+@pytest.fixture
+def shared_profiler(tmp_path, monkeypatch):
+    """Replace the module-level profiler with one writing to tmp_path."""
+    instance = Profiler(enabled=True, sample_rate=1.0, output_dir=str(tmp_path))
+    monkeypatch.setattr(profiling, "profiler", instance)
+    return instance
+
+
+def _profile_dirs(output_dir):
+    return sorted(os.listdir(output_dir)) if os.path.exists(output_dir) else []
+
+
+def test_disabled_profiler_never_samples(tmp_path):
+    profiler = Profiler(enabled=False, sample_rate=1.0, output_dir=str(tmp_path))
+    profiler.start_window(60)
+
+    with profiler.session("index") as session:
+        assert session is None
+
+    assert _profile_dirs(tmp_path) == []
+
+
+def test_sample_rate():
+    assert Profiler(enabled=True, sample_rate=1.0).should_sample()
+    assert not Profiler(enabled=True, sample_rate=0.0).should_sample()
+
+
+def test_window_samples_every_request():
+    profiler = Profiler(enabled=True, sample_rate=0.0)
+    assert not profiler.should_sample()
+
+    profiler.start_window(60)
+    assert profiler.should_sample()
+
+    profiler.start_window(-1)
+    assert not profiler.should_sample()
+
+
+def test_session_writes_sections_and_call_tree(shared_profiler, tmp_path):
+    with shared_profiler.session("POST /api/v1/search/search") as session:
+        with profile_section("text_encode"):
+            pass
+        with profile_section("text_encode"):
+            pass
+        with profile_section("faiss_search"):
+            pass
+
+    dirs = _profile_dirs(tmp_path)
+    assert len(dirs) == 1
+    assert dirs[0].endswith(f"-POST_api_v1_search_search-{session.id}")
+
+    directory = os.path.join(tmp_path, dirs[0])
+    assert os.path.exists(os.path.join(directory, "cprofile.prof"))
+    with open(os.path.join(directory, "sections.json")) as f:
+        data = json.load(f)
+    assert data["id"] == session.id
+    assert data["sections"]["text_encode"]["count"] == 2
+    assert data["sections"]["faiss_search"]["count"] == 1
+
+
+def test_section_outside_session_is_noop(shared_profiler, tmp_path):
+    with profile_section("text_encode"):
+        pass
+
+    assert _profile_dirs(tmp_path) == []
+
+
+def test_nested_session_is_not_sampled(shared_profiler):
+    with shared_profiler.session("outer") as outer:
+        with shared_profiler.session("inner") as inner:
+            assert inner is None
+        assert outer is not None
+
+
+def test_failed_start_releases_lock_and_call_profiler(
+    shared_profiler, tmp_path, monkeypatch, caplog
+):
+    def fail():
+        raise ImportError("No module named 'torch'")
+
+    monkeypatch.setattr(shared_profiler, "_start_torch_profiler", fail)
+
+    # 启动失败时代码块照常执行，只是不采样
+    ran = False
+    with shared_profiler.session("index") as session:
+        assert session is None
+        assert sys.getprofile() is None
+        with profile_section("text_encode"):
+            ran = True
+
+    assert ran
+    assert "Failed to start profiler" in caplog.text
+    assert sys.getprofile() is None
+    assert profiling._current_session.get() is None
+    assert not shared_profiler._lock.locked()
+    assert _profile_dirs(tmp_path) == []
+
+    # 之后的会话仍能正常采样
+    monkeypatch.undo()
+    monkeypatch.setattr(profiling, "profiler", shared_profiler)
+    with shared_profiler.session("index") as session:
+        assert session is not None
+
+
+def test_failed_write_does_not_raise(shared_profiler, monkeypatch, caplog):
+    def fail(*args):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(shared_profiler, "_write", fail)
+
+    with shared_profiler.session("index") as session:
+        assert session is not None
+
+    assert "Failed to write profile" in caplog.text
+    assert sys.getprofile() is None
+    assert profiling._current_session.get() is None
+    assert not shared_profiler._lock.locked()
+
+
+def test_session_cleans_up_when_block_raises(shared_profiler, tmp_path):
+    with pytest.raises(RuntimeError):
+        with shared_profiler.session("index"):
+            raise RuntimeError("boom")
+
+    assert sys.getprofile() is None
+    assert not shared_profiler._lock.locked()
+    assert len(_profile_dirs(tmp_path)) == 1
+
+
+async def _app(scope, receive, send):
+    with profile_section("endpoint"):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+
+def _call(middleware, scope):
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return messages
+
+
+def test_middleware_adds_profile_id(shared_profiler, tmp_path):
+    scope = {"type": "http", "method": "GET", "path": "/health"}
+    messages = _call(ProfilingMiddleware(_app), scope)
+
+    headers = dict(messages[0]["headers"])
+    profile_id = headers[b"x-profile-id"].decode()
+    dirs = _profile_dirs(tmp_path)
+    assert len(dirs) == 1
+    assert dirs[0].endswith(f"-GET_health-{profile_id}")
+    with open(os.path.join(tmp_path, dirs[0], "sections.json")) as f:
+        assert json.load(f)["sections"]["endpoint"]["count"] == 1
+
+
+def test_middleware_passes_through_when_disabled(shared_profiler, tmp_path):
+    shared_profiler.enabled = False
+    scope = {"type": "http", "method": "GET", "path": "/health"}
+    messages = _call(ProfilingMiddleware(_app), scope)
+
+    assert messages[0]["headers"] == []
+    assert _profile_dirs(tmp_path) == []
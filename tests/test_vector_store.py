@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("faiss")
+
+from src.utils.vector_store import VectorStore  # noqa: E402
+
+DIMENSION = 8
+
+
+def _fill(store, start, count):
+    for i in range(start, start + count):
+        store.add(np.full(DIMENSION, i, dtype=np.float32), {"text": f"item {i}"})
+
+
+def _assert_items(store, count):
+    assert store.next_id == count
+    assert store.index.ntotal == count
+    assert store.metadata == {i: {"text": f"item {i}"} for i in range(count)}
+    if count:
+        idx, dist, metadata = store.search(np.full(DIMENSION, count - 1), k=1)[0]
+        assert (idx, dist, metadata) == (count - 1, 0.0, {"text": f"item {count - 1}"})
+
+
+def test_save_and_load(tmp_path):
+    store = VectorStore(dimension=DIMENSION)
+    _fill(store, 0, 5)
+    store.save(str(tmp_path))
+
+    _assert_items(VectorStore.load(str(tmp_path)), 5)
+    assert sorted(os.listdir(tmp_path)) == ["index.faiss", "metadata.json"]
+
+
+def test_truncate(tmp_path):
+    store = VectorStore(dimension=DIMENSION)
+    _fill(store, 0, 5)
+    store.truncate(3)
+
+    _assert_items(store, 3)
+    with pytest.raises(ValueError):
+        store.truncate(4)
+
+
+def test_journal_appends_only_new_items(tmp_path):
+    journal = str(tmp_path / "journal")
+    store = VectorStore(dimension=DIMENSION)
+    _fill(store, 0, 3)
+    state = store.append_journal(journal, 0)
+    _fill(store, 3, 2)
+    state = store.append_journal(journal, state["next_id"])
+
+    assert state["next_id"] == 5
+    assert os.path.getsize(os.path.join(journal, "vectors.f32")) == 5 * DIMENSION * 4
+    _assert_items(VectorStore.load_journal(journal, DIMENSION, **state), 5)
+
+
+def test_journal_drops_data_after_checkpoint(tmp_path):
+    journal = str(tmp_path / "journal")
+    store = VectorStore(dimension=DIMENSION)
+    _fill(store, 0, 3)
+    state = store.append_journal(journal, 0)
+    # 写checkpoint前中断：日志中多出的记录应被截掉
+    _fill(store, 3, 2)
+    store.append_journal(journal, 3)
+
+    restored = VectorStore.load_journal(journal, DIMENSION, **state)
+    _assert_items(restored, 3)
+
+    _fill(restored, 3, 1)
+    state = restored.append_journal(journal, 3)
+    _assert_items(VectorStore.load_journal(journal, DIMENSION, **state), 4)
+
+
+def test_journal_shorter_than_checkpoint(tmp_path):
+    journal = str(tmp_path / "journal")
+    store = VectorStore(dimension=DIMENSION)
+    _fill(store, 0, 2)
+    state = store.append_journal(journal, 0)
+
+    with pytest.raises(ValueError, match="shorter"):
+        VectorStore.load_journal(
+            journal, DIMENSION, state["next_id"] + 1, state["metadata_bytes"]
+        )